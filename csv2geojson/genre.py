@@ -1,4 +1,8 @@
 import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
 
 
 class GenreNotFoundError(Exception):
@@ -17,6 +21,95 @@ GENRE_カフェ = 9
 GENRE_その他 = 10
 
 
+# 各ジャンルの判定用パターン
+# MEMO: 行数分classify()が呼ばれるので、毎回re.searchに文字列を渡さずにモジュール読み込み時にコンパイルしておく
+
+# 10. その他
+# MEMO: 「焼きそば」を「そば」より先にHitさせる必要がある
+# 旅館・ホテルあたりはレストラン寄りなのかもしれない…　何もわからん…
+_PATTERN_その他 = re.compile("その他|お好み焼|焼きそば|粉物|たこ焼|明石焼|もんじゃ|イートイン|旅館|ホテル|飲食店")
+
+# 5: 麺類
+# MEMO: "中華そば"という文字列を"中華"より先にmatchさせる必要があり、さらに"焼きそば"というは
+# ここではmatchさせない(その他を優先)するようにしないといけない
+# MEMO: 栃木県など「うどん・そば・丼」というジャンルがあり、うどん/そば = 麺類　と 丼 = ファーストフード が混ざってるので
+# 悩んだ結果麺類を優先させた
+_PATTERN_麺類 = re.compile("ラーメン|らーめん|つけめん|そば|蕎麦|うどん|ちゃんぽん|きしめん|麺|麵|中華そば")
+
+# 8: ファーストフード・ファミレス・食堂
+# MEMO: "ハンバーガー"が"バー"と誤Hitするので判定順を前に
+# MEMO: 「丼物」を麺類系からファストフード・食堂系にジャンル変更
+_PATTERN_ファミレス = re.compile(
+    "ハンバーガー|ファーストフード|ファストフード|ファミレス|レストラン|バイキング|ドライブイン|フードコート|ブッフェ"
+    "|定食|食事処|食堂|フライドチキン|から揚げ|からあげ|ザンギ|サンドイッチ|サンドウィッチ|丼|どんぶり|軽食|弁当"
+)
+
+# 3: 洋食・フレンチ・イタリアン,
+# MEMO: "ハンバーグ"が"バー"と誤Hitするので判定順を前に (飲み屋系より洋食系が先にHitしてしまうが、副作用ないか…？)
+# スパゲッティは麺類なのか、何もわからない
+_PATTERN_洋食 = re.compile(
+    "洋食|欧風|欧州|西洋|オムライス|シチュー|フランス|フレンチ|イタリア|ドイツ|イギリス|スペイン|ギリシャ|ヨーロッパ"
+    "|スパゲティ|ハンバーグ|パスタ|ピザ|ピッツァ|ピッツェリア|スパゲッティ|ビストロ|アメリカ|ロシア|地中海|ポルトガル|ハワイアン"
+)
+
+# 7: ステーキ・鉄板焼・焼肉・ホルモン,
+# 富山県の「焼き鳥・焼肉」というジャンルを、焼肉側に倒すためにこの判定順
+_PATTERN_焼肉 = re.compile("焼肉|焼き肉|ステーキ|鉄板|ホルモン|もつ焼|もつやき|ジンギスカン|牛たん|牛タン|牛肉")
+
+# 1: 居酒屋・バー・ダイニングバー・バル
+# MEMO: ラウンジっていう風営法？的なジャンルがあるらしいが、空港とかにある待合室的なラウンジも含まれてしまう気もする
+_PATTERN_居酒屋 = re.compile(
+    "居酒屋|バル|バー|BAR|Bar|酒場|ビヤホール|ビアホール|ビアガーデン|ダイニング"
+    "|カクテル|ビール|ワイン|日本酒|酒類|ハイボール|呑み|宴会|屋形船|パブ|スナック|カラオケ|クラブ|ラウンジ"
+    "|やきとん|やきとり|ヤキトリ|焼鳥|焼き鳥|焼きとり|鳥料理|串揚|串カツ|串かつ|串焼|炉端焼|炭火焼|牡蠣|BBQ"
+)
+
+# 2: 和食
+# もうわかんなくなってきた...
+# 「しゃぶしゃぶ、すき焼き」は「肉料理」として焼肉と並列で扱っている都道府県もあるが、
+# ここでは愛媛県の分類に準拠して「鍋料理」と一緒のカテゴリにしてる
+_PATTERN_和食 = re.compile(
+    "和食|和風|日本料理|郷土料理|沖縄|九州|京料理|懐石|会席|割烹|料亭|小料理|天ぷら|天麩羅|刺身|精進"
+    "|うなぎ|鰻|ふぐ|はも|うに|すっぽん|あなご|あんこう|すき焼き|しゃぶしゃぶ|川魚|魚料理|鶏料理|ひっつみ"
+    "|とんかつ|かに料理|海鮮|おにぎり|おむすび|お茶漬け|釜飯|おでん|鍋|ちゃんこ|水炊き|すし|寿司|鮨|ひつまぶし"
+)
+
+# 4: 中華
+# MEMO: 餃子は単体では中華になるように、たいていは「ラーメン・餃子」なのでラーメンが麺類で先にHitするはず
+# 日高屋は何屋なんだという問題には目をつぶっていく
+_PATTERN_中華 = re.compile("中華|中国|台湾|四川|広東|上海|点心|飲茶|餃子|薬膳")
+
+# 6: カレー・アジア・エスニック・各国料理
+# MEMO: 山形県は「居酒屋・創作料理」というジャンルがあるが、居酒屋に寄せた
+_PATTERN_各国料理 = re.compile(
+    "アジア|エスニック|韓国|朝鮮|無国籍|多国籍|南米|中東|各国|インド|カレー|カリー|メキシコ|メキシカン|ブラジル|アフリカ"
+    "|ベトナム|トルコ|タイ料理|フォー|シンガポール|ネパール|創作"
+)
+
+# 9: カフェ・スイーツ
+_PATTERN_カフェ = re.compile(
+    "カフェ|Cafe|CAFE|パーラー|スイーツ|コーヒー|クレープ|パンケーキ|喫茶|甘味|珈琲|紅茶|茶房"
+    "|パフェ|チョコレート|アイスクリーム|菓子|デザート|ケーキ|ドーナツ|ジェラート|ジュース|ドリンク"
+)
+
+# 判定順(=優先度順)
+_GENRE_PATTERNS = [
+    (GENRE_その他, _PATTERN_その他),
+    (GENRE_麺類, _PATTERN_麺類),
+    (GENRE_ファミレス, _PATTERN_ファミレス),
+    (GENRE_洋食, _PATTERN_洋食),
+    (GENRE_焼肉, _PATTERN_焼肉),
+    (GENRE_居酒屋, _PATTERN_居酒屋),
+    (GENRE_和食, _PATTERN_和食),
+    (GENRE_中華, _PATTERN_中華),
+    (GENRE_各国料理, _PATTERN_各国料理),
+    (GENRE_カフェ, _PATTERN_カフェ),
+]
+
+
+# MEMO: 同じジャンル名が何度も出てくるので(「居酒屋」「ラーメン」など)、結果をキャッシュしておく
+# (GenreNotFoundErrorになるものはキャッシュされないが、件数的には少ないので気にしない)
+@lru_cache(maxsize=None)
 def classify(genre_name: str):
     """
     各都道府県で好き勝手に設定されているジャンル名を寄せる
@@ -39,94 +132,35 @@ def classify(genre_name: str):
         return GENRE_その他
 
     # 複数カテゴリ指定されている場合、最初のものだけで判定
-    genre_name = genre_name.split("|")[0]
-
-    # 10. その他
-    if re.search("その他|お好み焼|焼きそば|粉物|たこ焼|明石焼|もんじゃ|イートイン|旅館|ホテル|飲食店", genre_name):
-        # MEMO: 「焼きそば」を「そば」より先にHitさせる必要がある
-        # 旅館・ホテルあたりはレストラン寄りなのかもしれない…　何もわからん…
-        return GENRE_その他
+    genre_name = genre_name.partition("|")[0]  # MEMO: splitだと不要なlistが作られるのでpartition
 
-    # 5: 麺類
-    if re.search("ラーメン|らーめん|つけめん|そば|蕎麦|うどん|ちゃんぽん|きしめん|麺|麵|中華そば", genre_name):
-        # MEMO: "中華そば"という文字列を"中華"より先にmatchさせる必要があり、さらに"焼きそば"というは
-        # ここではmatchさせない(その他を優先)するようにしないといけない
-        # MEMO: 栃木県など「うどん・そば・丼」というジャンルがあり、うどん/そば = 麺類　と 丼 = ファーストフード が混ざってるので
-        # 悩んだ結果麺類を優先させた
-        return GENRE_麺類
-
-    # 8: ファーストフード・ファミレス・食堂
-    if re.search(
-        "ハンバーガー|ファーストフード|ファストフード|ファミレス|レストラン|バイキング|ドライブイン|フードコート|ブッフェ"
-        + "|定食|食事処|食堂|フライドチキン|から揚げ|からあげ|ザンギ|サンドイッチ|サンドウィッチ|丼|どんぶり|軽食|弁当",
-        genre_name,
-    ):
-        # MEMO: "ハンバーガー"が"バー"と誤Hitするので判定順を前に
-        # MEMO: 「丼物」を麺類系からファストフード・食堂系にジャンル変更
-        return GENRE_ファミレス
-
-    # 3: 洋食・フレンチ・イタリアン,
-    if re.search(
-        "洋食|欧風|欧州|西洋|オムライス|シチュー|フランス|フレンチ|イタリア|ドイツ|イギリス|スペイン|ギリシャ|ヨーロッパ"
-        + "|スパゲティ|ハンバーグ|パスタ|ピザ|ピッツァ|ピッツェリア|スパゲッティ|ビストロ|アメリカ|ロシア|地中海|ポルトガル|ハワイアン",
-        genre_name,
-    ):
-        # MEMO: "ハンバーグ"が"バー"と誤Hitするので判定順を前に (飲み屋系より洋食系が先にHitしてしまうが、副作用ないか…？)
-        # スパゲッティは麺類なのか、何もわからない
-        return GENRE_洋食
-
-    # 7: ステーキ・鉄板焼・焼肉・ホルモン,
-    if re.search("焼肉|焼き肉|ステーキ|鉄板|ホルモン|もつ焼|もつやき|ジンギスカン|牛たん|牛タン|牛肉", genre_name):
-        # 富山県の「焼き鳥・焼肉」というジャンルを、焼肉側に倒すためにこの判定順
-        return GENRE_焼肉
-
-    # 1: 居酒屋・バー・ダイニングバー・バル
-    if re.search(
-        "居酒屋|バル|バー|BAR|Bar|酒場|ビヤホール|ビアホール|ビアガーデン|ダイニング"
-        + "|カクテル|ビール|ワイン|日本酒|酒類|ハイボール|呑み|宴会|屋形船|パブ|スナック|カラオケ|クラブ|ラウンジ"
-        + "|やきとん|やきとり|ヤキトリ|焼鳥|焼き鳥|焼きとり|鳥料理|串揚|串カツ|串かつ|串焼|炉端焼|炭火焼|牡蠣|BBQ",
-        genre_name,
-    ):
-        # MEMO: ラウンジっていう風営法？的なジャンルがあるらしいが、空港とかにある待合室的なラウンジも含まれてしまう気もする
-        return GENRE_居酒屋
-
-    # 2: 和食
-    if re.search(
-        "和食|和風|日本料理|郷土料理|沖縄|九州|京料理|懐石|会席|割烹|料亭|小料理|天ぷら|天麩羅|刺身|精進"
-        + "|うなぎ|鰻|ふぐ|はも|うに|すっぽん|あなご|あんこう|すき焼き|しゃぶしゃぶ|川魚|魚料理|鶏料理|ひっつみ"
-        + "|とんかつ|かに料理|海鮮|おにぎり|おむすび|お茶漬け|釜飯|おでん|鍋|ちゃんこ|水炊き|すし|寿司|鮨|ひつまぶし",
-        genre_name,
-    ):
-        # もうわかんなくなってきた...
-        # 「しゃぶしゃぶ、すき焼き」は「肉料理」として焼肉と並列で扱っている都道府県もあるが、
-        # ここでは愛媛県の分類に準拠して「鍋料理」と一緒のカテゴリにしてる
-        return GENRE_和食
-
-    # 4: 中華
-    if re.search("中華|中国|台湾|四川|広東|上海|点心|飲茶|餃子|薬膳", genre_name):
-        # MEMO: 餃子は単体では中華になるように、たいていは「ラーメン・餃子」なのでラーメンが麺類で先にHitするはず
-        # 日高屋は何屋なんだという問題には目をつぶっていく
-        return GENRE_中華
-
-    # 6: カレー・アジア・エスニック・各国料理
-    if re.search(
-        "アジア|エスニック|韓国|朝鮮|無国籍|多国籍|南米|中東|各国|インド|カレー|カリー|メキシコ|メキシカン|ブラジル|アフリカ" + "|ベトナム|トルコ|タイ料理|フォー|シンガポール|ネパール|創作",
-        genre_name,
-    ):
-        # MEMO: 山形県は「居酒屋・創作料理」というジャンルがあるが、居酒屋に寄せた
-        return GENRE_各国料理
-
-    # 9: カフェ・スイーツ
-    if re.search(
-        "カフェ|Cafe|CAFE|パーラー|スイーツ|コーヒー|クレープ|パンケーキ|喫茶|甘味|珈琲|紅茶|茶房"
-        + "|パフェ|チョコレート|アイスクリーム|菓子|デザート|ケーキ|ドーナツ|ジェラート|ジュース|ドリンク",
-        genre_name,
-    ):
-        return GENRE_カフェ
+    # 判定順に上から見ていき、最初にHitしたジャンルを採用
+    for genre_code, pattern in _GENRE_PATTERNS:
+        if pattern.search(genre_name):
+            return genre_code
 
     raise GenreNotFoundError(f"Unknown={genre_name}")
 
 
+def classify_all(genre_names: pd.Series):
+    """
+    classify()の列単位版。ジャンル名の列をまとめて判定し、genre_codeの配列(np.ndarray)を返す
+    ・ジャンル名の種類は行数よりずっと少ない(「居酒屋」「ラーメン」など)ので、
+    　重複を除いたジャンル名ごとに1回だけclassify()で判定し、その結果を各行に割り当てる
+    ・ジャンル名が空の場合はGENRE_その他、どのジャンルにも当たらなかった場合は0
+    """
+    codes, uniques = pd.factorize(genre_names.fillna(""))
+
+    table = np.zeros(len(uniques), dtype=int)
+    for i, genre_name in enumerate(uniques):
+        try:
+            table[i] = classify(genre_name)
+        except GenreNotFoundError:
+            pass
+
+    return table[codes]
+
+
 if __name__ == "__main__":
     # usage:
     # $ python -m csv2geojson.genre
@@ -150,4 +184,17 @@ if __name__ == "__main__":
     except GenreNotFoundError:
         pass
 
+    # 列単位でも同じ結果になる
+    names = pd.Series(["", None, "ハンバーガーヒル", "焼きそば専門店", "フレンチ食堂", "創作居酒屋カフェ", "火鍋専門店", "謎のジャンル"])
+    assert classify_all(names).tolist() == [
+        GENRE_その他,
+        GENRE_その他,
+        GENRE_ファミレス,
+        GENRE_その他,
+        GENRE_ファミレス,
+        GENRE_居酒屋,
+        GENRE_和食,
+        0,
+    ]
+
     print("success!!")
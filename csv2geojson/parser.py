@@ -1,32 +1,139 @@
 import json
+import logging
+import os
 import pathlib
+import pickle
 import shutil
-from collections import OrderedDict
-from urllib.parse import quote
+from multiprocessing import Pool
+from urllib.parse import quote_from_bytes
 
 import numpy as np
 import pandas as pd
-from geojson import Feature, FeatureCollection, Point
 from logzero import logger
 
 from csv2geojson import exceptions, genre, util
 
 # FIXME: やっつけ実装
 
+# GoogleMapの検索URL(この後ろに住所+店名をURLエンコードしてつなげる)
+# @see https://developers.google.com/maps/documentation/urls/get-started#search-action
+GOOGLE_MAP_SEARCH_URL = "https://www.google.com/maps/search/?api=1&query="
 
-def normalize_and_geocode(row: pd.Series, pref_name: str):
+
+# normalize_and_geocode()で追加される項目(DataFrameに戻す際の列順)
+NORMALIZED_FIELDS = [
+    "normalized_address",
+    "_dams_score",
+    "_dams_name",
+    "_dams_tail",
+    "lat",
+    "lng",
+    "google_map_url",
+    "_ERROR",
+    "_WARNING",
+    "_gsi_map_url",
+]
+
+
+def geocode_normalized_address(normalized_address: str):
     """
-    ジャンル名と住所を正規化し、ジオコーディングで取得した地理情報と合わせてGeoJSONの1Pointに相当するpd.Seriresを生成
+    正規化済みの住所のジオコーディング
+    MEMO: プロセス並列で使うので、GeocodeErrorはraiseせずに戻り値として返す
     """
-    # ジャンル再分類
     try:
-        genre_code = genre.classify(row["genre_name"])
-        row["genre_code"] = genre_code
-    except genre.GenreNotFoundError as e:
-        # ログに出すだけ
-        logger.info(e)
-        logger.info("🍴 {}: {}".format(e, row.to_dict()))
-        row["genre_code"] = genre.GENRE_その他
+        return util.geocode_with_pydams(normalized_address)
+    except exceptions.GeocodeError as e:
+        return e
+
+
+def geocode_address(address: str, pref_name: str):
+    """
+    住所の正規化とジオコーディング(normalize_and_geocode()のうち、住所だけで結果が決まる部分)
+    MEMO: NormalizeError, GeocodeErrorはraiseせずに戻り値として返す
+    """
+    try:
+        normalized_address = util.normalize_for_pydams(address, pref_name)
+    except exceptions.NormalizeError as e:
+        return e
+    result = geocode_normalized_address(normalized_address)
+    if isinstance(result, Exception):
+        return result
+    return (normalized_address,) + result
+
+
+def geocode_addresses(addresses: list, pref_name: str, processes=None):
+    """
+    住所のlistをまとめて正規化・ジオコーディングし、{住所: geocode_address()の結果}のdictを返す
+    MEMO: 住所の正規化は軽いのでそのまま処理し、重いジオコーディング(DAMS)だけを正規化後の住所ごとに1回ずつ、プロセス並列で行う
+    (ビル名などが違っていても、正規化後の住所が同じであればジオコーディング結果は同じ)
+    DAMSはGILを解放しないのでスレッドではなくプロセス。DAMSはworkerを立ち上げる前に初期化しておく
+    (forkならそのまま引き継がれ、spawnの場合はworkerの初期化時に呼ばれる)
+    processes: ジオコーディングの並列数(None=CPU数、1=並列化しない)
+    """
+    normalized = {}
+    for address in addresses:
+        try:
+            normalized[address] = util.normalize_for_pydams(address, pref_name)
+        except exceptions.NormalizeError as e:
+            normalized[address] = e
+
+    targets = list(dict.fromkeys(n for n in normalized.values() if not isinstance(n, Exception)))
+    # MEMO: 件数の少ない都道府県でCPU数分のworkerを立ち上げても無駄なので、worker数はジオコーディング対象の件数までにする
+    processes = min(processes or os.cpu_count(), len(targets))
+    if processes <= 1:
+        results = [geocode_normalized_address(n) for n in targets]
+    else:
+        util.init_dams()
+        with Pool(processes, initializer=util.init_dams) as pool:
+            results = pool.map(geocode_normalized_address, targets)
+    geocoded = dict(zip(targets, results))
+
+    ret = {}
+    for address, normalized_address in normalized.items():
+        if isinstance(normalized_address, Exception):
+            ret[address] = normalized_address
+        elif isinstance(geocoded[normalized_address], Exception):
+            ret[address] = geocoded[normalized_address]
+        else:
+            ret[address] = (normalized_address,) + geocoded[normalized_address]
+    return ret
+
+
+def load_geocode_cache(path: pathlib.Path):
+    """
+    ジオコーディング結果のキャッシュ({住所: geocode_address()の結果})を読み込む
+    """
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        # MEMO: キャッシュが壊れていても、ジオコーディングし直せばいいだけなので処理を続行
+        logger.warning("ジオコーディング結果のキャッシュが読み込めませんでした。 path=%s, %s", path, e)
+        return {}
+
+
+def save_geocode_cache(path: pathlib.Path, cache: dict):
+    """
+    ジオコーディング結果のキャッシュを保存
+    MEMO: 書き込み途中で落ちても壊れたキャッシュが残らないよう、一時ファイルに書き込んでから置き換える
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def normalize_and_geocode(row: dict, pref_name: str, geocoded: dict = None):
+    """
+    ジャンル名と住所を正規化し、ジオコーディングで取得した地理情報と合わせてGeoJSONの1Pointに相当するdictを生成
+    MEMO: pd.Seriesへの代入は遅いので、dictで受け取ってdictで返す
+    geocoded: 住所ごとのgeocode_address()の結果(指定がなければその場でジオコーディングする)
+    """
+    # MEMO: ジャンル再分類は行ごとではなく、Csv2GeoJSON._parse()で列単位でまとめて行っている
+    row = dict(row)
 
     # latlng取得
     try:
@@ -39,21 +146,25 @@ def normalize_and_geocode(row: pd.Series, pref_name: str):
             row["_dams_score"] = ""
             row["_dams_name"] = ""
             row["_dams_tail"] = ""
-            googlemap_q_string = "{} {}".format(row["address"], row["shop_name"])
+            googlemap_q_string = row["address"] + " " + row["shop_name"]
         else:
             # 住所からジオコーディングでlatlngを求める
             address = row["address"]
-            normalized_address = util.normalize_for_pydams(address, pref_name)
-            lat, lng, _dams_info = util.geocode_with_pydams(normalized_address)
+            result = geocoded[address] if geocoded is not None else geocode_address(address, pref_name)
+            if isinstance(result, Exception):
+                # MEMO: 同じ住所の行では同じ例外インスタンスを使い回すので、tracebackはリセットしておく
+                raise result.with_traceback(None)
+            normalized_address, lat, lng, _dams_info = result
             row["normalized_address"] = normalized_address
             row["_dams_score"] = _dams_info[0]
             row["_dams_name"] = _dams_info[1]
             row["_dams_tail"] = _dams_info[2]
-            googlemap_q_string = "{} {}".format(normalized_address, row["shop_name"])
+            googlemap_q_string = normalized_address + " " + row["shop_name"]
 
         row["lat"] = lat
         row["lng"] = lng
-        row["google_map_url"] = "https://www.google.com/maps/search/?api=1&query=" + quote(googlemap_q_string)
+        # MEMO: quote()も内部でUTF-8にencodeしてからquote_from_bytes()を呼んでいるだけなので、直接呼ぶ(safeはquote()のデフォルトと同じ)
+        row["google_map_url"] = GOOGLE_MAP_SEARCH_URL + quote_from_bytes(googlemap_q_string.encode("utf-8"), safe=b"/")
         row["_ERROR"] = np.nan
         row["_WARNING"] = np.nan
         row["_gsi_map_url"] = f"https://maps.gsi.go.jp/#17/{lat}/{lng}/"
@@ -65,7 +176,7 @@ def normalize_and_geocode(row: pd.Series, pref_name: str):
         name = e.__class__.__name__
         row["_ERROR"] = f"{name}({e})"
         logger.warning(e)
-        logger.warning("👁 {}: {}".format(name, row.to_dict()))
+        logger.warning("👁 %s: %s", name, row)  # MEMO: ログ出力されない場合はrowの文字列化も行わない
 
     # バリデーションチェック
     try:
@@ -75,51 +186,88 @@ def normalize_and_geocode(row: pd.Series, pref_name: str):
         name = e.__class__.__name__
         row["_WARNING"] = f"{name}({e})"
         logger.info(e)
-        logger.info("❓ {}: {}".format(name, row.to_dict()))
+        logger.info("❓ %s: %s", name, row)
 
     return row
 
 
-def make_feature(row: pd.Series, debug=False):
+def make_feature(row: dict, debug=False):
     """
     GeoJSONのFeature要素(POINT限定)を作成
-    @see https://pypi.org/project/geojson/#point
+    MEMO: geojsonライブラリのFeature/Pointは生成のたびにバリデーションが走るので、同じ構造のdictを直接作っている
+    @see https://tools.ietf.org/html/rfc7946#section-3.2
     """
-    try:
-        # debugオプションの有無でprefixに'_'がついた項目を出し分け
-        props = (
-            OrderedDict(row)
-            if debug
-            else OrderedDict({k: v for k, v in OrderedDict(row).items() if not k.startswith("_")})
-        )
+    # debugオプションの有無でprefixに'_'がついた項目を出し分け
+    # MEMO: dictも挿入順を保持する(CPython3.6以降)ので、OrderedDictは使わない
+    props = dict(row) if debug else {k: v for k, v in row.items() if not k.startswith("_")}
+
+    # lat, lngは「properites」ではなく「geometry」に配置
+    # (lat, lngがない行はKeyErrorがそのまま上がる)
+    lat = props.pop("lat")
+    lng = props.pop("lng")
+
+    return point_feature(lat, lng, props)
 
-        # lat, lngは「properites」ではなく「geometry」に配置
-        lat = props.pop("lat")
-        lng = props.pop("lng")
-    except Exception:
-        logger.error(props, stack_info=True)
-        raise
 
-    coords = (lng, lat)  # MEMO: lng, latの順番に注意
-    return Feature(geometry=Point(coords), properties=props)
+def point_feature(lat, lng, properties: dict):
+    """
+    lat, lngとpropertiesからGeoJSONのFeature要素(POINT限定)を作成
+    """
+    # MEMO: lng, latの順番に注意
+    # geojson.Point()と同じく座標は小数点以下6桁に丸める(公式サイトから提供されたlatlngはそのままだと丸められていないため)
+    coords = [round(lng, 6), round(lat, 6)]
+    return {"type": "Feature", "geometry": {"type": "Point", "coordinates": coords}, "properties": properties}
+
+
+def to_records(df: pd.DataFrame):
+    """
+    DataFrameの各行をdictにしたlist(df.to_dict(orient="records")と同じ結果)
+    MEMO: df.apply(axis=1)やdf.iterrows()だと行ごとにpd.Seriesが作られて遅く、
+    df.to_dict(orient="records")も値ごとに型変換のチェックが入るので、列名とタプルをzipしてdictにしている
+    """
+    columns = df.columns.tolist()
+    return [dict(zip(columns, values)) for values in df.itertuples(index=False, name=None)]
+
+
+def dump_feature(feature: dict, debug=False):
+    """
+    Feature要素をGeoJSONファイルに埋め込む形式の文字列にする
+    ・デバッグ用は読みやすいようにprettyして、FeatureCollectionの中に入る分のインデントも付けておく
+    ・本番用はデータサイズ削減のためminifyする
+    MEMO: json.dump()はindentの有無に関わらずPython実装のエンコーダでchunkごとに書き込むので遅い。
+    json.dumps()ならindentなしの場合はCのエンコーダが使われるので、Feature要素ごとに文字列にしておく
+    """
+    if debug:
+        return "\n        " + json.dumps(feature, ensure_ascii=False, indent=4).replace("\n", "\n        ")
+    return json.dumps(feature, ensure_ascii=False, separators=(",", ":"))
 
 
-def write_geojson(dest, df: pd.DataFrame, debug=False):
+def write_geojson(dest, dumped_features: list, debug=False):
     """
     GeoJSONファイルを作成
+    MEMO: FeatureCollection全体をまとめてjson.dumpせず、dump_feature()で文字列にしたFeature要素を連結して書き出す
+    (出力結果はFeatureCollectionをまとめてjson.dumpした場合と同じ)
     """
-    # GeoJSONのFeatureCollection要素, Feature要素を作成
-    # @see https://pypi.org/project/geojson/#featurecollection
-    logger.debug("  レコード数= {}".format(len(df)))
-    features = df.apply(make_feature, axis=1, debug=debug).tolist()
-    feature_collection = FeatureCollection(features=features)
-    with open(dest, "w", encoding="utf-8") as f:
-        if debug:
-            # デバッグ用GeoJSONは読みやすいように、prettyして出力
-            json.dump(feature_collection, f, ensure_ascii=False, indent=4)
-        else:
-            # 本番用GeoJSONはデータサイズ削減のため、minifyして出力
-            json.dump(feature_collection, f, ensure_ascii=False, separators=(",", ":"))
+    # GeoJSONのFeatureCollection要素を作成
+    # @see https://tools.ietf.org/html/rfc7946#section-3.3
+    logger.debug("  レコード数= %d", len(dumped_features))
+    # MEMO: 書き込むデータが大きいので、バッファを大きめ(1MB)にしてシステムコールの回数を減らす
+    if debug:
+        # デバッグ用GeoJSON(json.dump(..., indent=4)と同じ形式)
+        header = '{\n    "type": "FeatureCollection",\n    "features": ['
+        footer = "\n    ]\n}" if dumped_features else "]\n}"
+    else:
+        # 本番用GeoJSON
+        header = '{"type":"FeatureCollection","features":['
+        footer = "]}"
+    with open(dest, "w", encoding="utf-8", buffering=1024 * 1024) as f:
+        f.write(header)
+        # MEMO: Feature要素を","でjoinした(ファイル全体分の)文字列を作らず、1要素ずつバッファに書き込んでいく
+        for i, dumped_feature in enumerate(dumped_features):
+            if i:
+                f.write(",")
+            f.write(dumped_feature)
+        f.write(footer)
 
 
 class Csv2GeoJSON:
@@ -150,40 +298,112 @@ class Csv2GeoJSON:
         "_dams_tail",
     ]
 
-    def __init__(self, src: pathlib.Path):
+    def __init__(self, src: pathlib.Path, processes=None, cache_dir: pathlib.Path = None):
+        """
+        processes: 正規化処理とジオコーディングの並列数(None=CPU数、1=並列化しない)
+        cache_dir: ジオコーディング結果のキャッシュ(都道府県ごと)の保存先(None=キャッシュしない)
+        """
+        self.processes = processes
+        self.cache_dir = cache_dir
         self._parse(src)
 
     def _parse(self, src: pathlib.Path):
-        logger.debug(f"入力CSV={src}")
+        logger.debug("入力CSV=%s", src)
 
         # CSVの全カラムを文字列として読み込む
         # MEMO: 書式によってはtel, zip_codeなどがintで認識される(例: "09012345678"、書式は各都道府県のサイトに依存)
         # 基本的にcrawler側では書式変換せず、(必要であれば)csv2geojson側で書式変換を行う方針。
         # (現状は特に処理していないが、必要なら郵便番号や電話番号のフォーマットを統一したりしてもよい)
+        # MEMO: na_filter=Falseにすると「NA」「N/A」「null」「NaN」のような文字列が空欄扱いされず、そのまま出力されたり
+        # telの書式チェックに引っかかったりして結果が変わってしまうので、pandasデフォルトの欠損値判定をしてから空文字列にしている
         df = pd.read_csv(src, encoding="utf-8", dtype=str).fillna("")
-        logger.debug("  入力レコード数= {}".format(len(df)))
+        logger.debug("  入力レコード数= %d", len(df))
 
         # 読み込んだCSVデータの重複レコードチェック(店名 and 住所)
         # データチェックとして十分とは言えないが、参考程度に
         # MEMO: 以下のパターンがあるので、店名および住所単体だと重複判定できない。
         # ・同じ店名の別の店(例: 愛知県の「すずや」)
         # ・同じ住所の別の店(例: 同じショッピングモール内)
-        duplicated_records = df[df.duplicated(subset=["shop_name", "address"])]
+        # MEMO: 全行に対する重複判定(ハッシュ計算)は1回だけにして、重複レコードとして出力する行、削除する行の判定は
+        # 重複している行だけを対象に行う(通常、重複している行はごく一部)
+        keys = ["shop_name", "address"]
+        dups = df[df.duplicated(subset=keys, keep=False)]
+        duplicated_records = dups[dups.duplicated(subset=keys)]
         if not duplicated_records.empty:
             # 重複行の削除
             ## MEMO: データ重複は(クローリングに実装ミスがなければ)公式サイト側の問題なので、重複削除したあとに処理を続行
-            df.drop_duplicates(subset=["shop_name", "address"], keep="last", inplace=True)
+            df.drop(index=dups.index[dups.duplicated(subset=keys, keep="last")], inplace=True)
         self.duplicated_df = duplicated_records
 
+        # ジャンル再分類
+        genre_codes = genre.classify_all(df["genre_name"])
+        logger.debug("  genre.classify: %s", genre.classify.cache_info())
+        if logger.isEnabledFor(logging.INFO):
+            # ログに出すだけ(ログ出力されない場合は行の取り出し自体を省略)
+            for row in to_records(df[genre_codes == 0]):
+                e = genre.GenreNotFoundError(f"Unknown={row['genre_name'].partition('|')[0]}")
+                logger.info(e)
+                logger.info("🍴 %s: %s", e, row)
+        genre_codes[genre_codes == 0] = genre.GENRE_その他
+        df["genre_code"] = genre_codes
+
         # 正規化処理とジオコーディング
         # (失敗した場合は_ERROR列に値が入るので、その行はエラーレコードとして処理)
+        # MEMO: チェーン店やショッピングモールなどで同じ住所が何度も出てくるので、ジオコーディングは住所ごとにまとめて行い、
+        # 結果を各行に割り当てる(util側のlru_cacheはプロセスごとなので、行単位で並列化するとworker間ではキャッシュが効かない)
         logger.info(f"normalize...")
-        df = df.apply(normalize_and_geocode, axis=1, pref_name=src.stem)
-        self.error_df = df[df["_ERROR"].notnull()].drop(columns=["_WARNING"])  # エラーレコードを取得
+        pref_name = src.stem
+        records = to_records(df)
+        # latlngが提供されている行はジオコーディング不要
+        addresses = df.loc[(df["provided_lat"] == "") | (df["provided_lng"] == ""), "address"].unique().tolist()
+        if self.cache_dir:
+            # MEMO: DAMSの結果は住所に対して一意なので、前回の実行でジオコーディングに成功した住所は結果を使い回す
+            # (入力CSVは毎回少しずつしか変わらないので、ほとんどの住所はキャッシュから取れる)
+            # 住所の正規化処理やDAMSの辞書を更新した場合はキャッシュを削除すること
+            cache_file = self.cache_dir / f"{pref_name}.pickle"
+            cache = load_geocode_cache(cache_file)
+            geocoded = {address: cache[address] for address in addresses if address in cache}
+            logger.debug("  キャッシュ済み住所数= %d", len(geocoded))
+            geocoded.update(geocode_addresses([a for a in addresses if a not in cache], pref_name, self.processes))
+            # 今回の入力に含まれる住所のうち、ジオコーディングに成功したものだけを保存(エラーになったものは次回再実行)
+            save_geocode_cache(cache_file, {a: r for a, r in geocoded.items() if not isinstance(r, Exception)})
+        else:
+            geocoded = geocode_addresses(addresses, pref_name, self.processes)
+        rows = [normalize_and_geocode(record, pref_name, geocoded) for record in records]
+        columns = list(df.columns) + [c for c in NORMALIZED_FIELDS if c not in df.columns]
+        df = pd.DataFrame(rows, index=df.index, columns=columns)
+        is_error = df["_ERROR"].notnull().to_numpy()  # MEMO: エラーレコードとそれ以外の振り分けで同じ判定を2回しない
+        self.error_df = df[is_error].drop(columns=["_WARNING"])  # エラーレコードを取得
         self.warning_df = df[df["_WARNING"].notnull()].drop(columns=["_ERROR"])  # ワーニングレコードを取得
         # エラーレコード以外を取得、_ERRORと_WARNING列は削除
         # MEMO: _WARNINGのデータについては_error.jsonに出すが、GeoJSONとnormalized_csvには出力する
-        self.normalized_df = df[df["_ERROR"].isnull()].drop(columns=["_ERROR", "_WARNING"])
+        self.normalized_df = df[~is_error].drop(columns=["_ERROR", "_WARNING"])
+        self._dumped_features = {}
+
+    def features(self, debug=False):
+        """
+        normalized_dfの各行をGeoJSONのFeature要素にしたlist
+        """
+        # MEMO: 行ごとにmake_feature()でdictを作ってからlat, lngをpopしたり、'_'で始まる項目を除外したりせず、
+        # 対象の列を1回だけ決めて、列ごとの値をzipしてFeature要素を作る(make_feature()と同じ結果になる)
+        df = self.normalized_df
+        columns = [c for c in df.columns if c not in ["lat", "lng"] and (debug or not c.startswith("_"))]
+        return [
+            point_feature(lat, lng, dict(zip(columns, values)))
+            for lat, lng, values in zip(
+                df["lat"].tolist(), df["lng"].tolist(), df[columns].itertuples(index=False, name=None)
+            )
+        ]
+
+    def dumped_features(self, debug=False):
+        """
+        features()の各Feature要素をdump_feature()で文字列にしたlist
+        MEMO: all.geojsonとジャンル別GeoJSONで同じFeature要素を使い回せるので、
+        debugの有無ごとに1回だけJSON文字列にしてキャッシュしておき、各ファイルではそれを連結するだけにしている
+        """
+        if debug not in self._dumped_features:
+            self._dumped_features[debug] = [dump_feature(feature, debug) for feature in self.features(debug)]
+        return self._dumped_features[debug]
 
     def write_normalized_csv(self, dest):
         """
@@ -191,40 +411,47 @@ class Csv2GeoJSON:
         """
         logger.info("create normalized_csv ...")
         self.normalized_df.to_csv(dest, columns=self.NORMALIZED_CSV_EXPORT_FIELDS, index=False)
-        logger.debug("  レコード数={}".format(len(self.normalized_df)))
+        logger.debug("  レコード数=%d", len(self.normalized_df))
 
     def write_all_geojson(self, dest, debug=False):
         """
         ジャンル分けなしでGeoJSONを出力
         """
-        logger.info("create all_geojson {} ...".format("<_debug> " if debug else ""))
-        write_geojson(dest, self.normalized_df, debug)
+        logger.info("create all_geojson %s ...", "<_debug> " if debug else "")
+        write_geojson(dest, self.dumped_features(debug), debug)
 
     def write_genred_geojson(self, output_dir, debug=False):
         """
         ジャンル別でGeoJSONを出力
         """
-        for genre_code in sorted(self.normalized_df["genre_code"].unique()):
+        dumped_features = self.dumped_features(debug)
+        # MEMO: ジャンルごとにgenre_code列全体を比較せず、genre_codeで1回だけ(安定)ソートして、値の境目で分割する
+        # (stableなので、各ジャンル内の並び順は元の行順のまま)
+        genre_codes = self.normalized_df["genre_code"].to_numpy()
+        if not len(genre_codes):
+            # MEMO: 出力するレコードがない場合はnp.split()が空配列を1つ返すので、ジャンル別GeoJSONは作らない
+            return
+        order = np.argsort(genre_codes, kind="stable")
+        boundaries = np.flatnonzero(np.diff(genre_codes[order])) + 1
+        for indices in np.split(order, boundaries):
+            genre_code = genre_codes[indices[0]]
             outfile = output_dir / f"genre{genre_code}.geojson"
-            df = self.normalized_df[self.normalized_df["genre_code"] == genre_code]
-            logger.info("create genre{}_geojson {} ...".format(genre_code, "<_debug> " if debug else ""))
-            write_geojson(outfile, df, debug)
+            logger.info("create genre%s_geojson %s ...", genre_code, "<_debug> " if debug else "")
+            write_geojson(outfile, [dumped_features[i] for i in indices], debug)
 
     def write_error_json(self, dest):
         """
         エラー確認用JSONを出力
         """
         logger.info(f"create _error.json ...")
-        logger.debug("  重複レコード数= {}".format(len(self.duplicated_df)))
-        logger.debug("  エラーレコード数= {}".format(len(self.error_df)))
-        logger.debug("  ワーニングレコード数= {}".format(len(self.warning_df)))
-        data = OrderedDict(
-            {
-                "duplicated": self.duplicated_df.fillna("").to_dict(orient="records"),
-                "error": self.error_df.fillna("").to_dict(orient="records"),
-                "warning": self.warning_df.fillna("").to_dict(orient="records"),
-            }
-        )
+        logger.debug("  重複レコード数= %d", len(self.duplicated_df))
+        logger.debug("  エラーレコード数= %d", len(self.error_df))
+        logger.debug("  ワーニングレコード数= %d", len(self.warning_df))
+        data = {
+            "duplicated": self.duplicated_df.fillna("").to_dict(orient="records"),
+            "error": self.error_df.fillna("").to_dict(orient="records"),
+            "warning": self.warning_df.fillna("").to_dict(orient="records"),
+        }
         with open(dest, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=4)  # pretty
 
@@ -238,6 +465,7 @@ class Csv2GeoJSON:
         output_dir_debug = output_dir / "_debug"
         output_dir_debug.mkdir(parents=True, exist_ok=True)
 
+        # MEMO: all.geojsonとジャンル別GeoJSONは、debugの有無ごとにキャッシュされたFeature要素の文字列(dumped_features())を使い回す
         self.write_normalized_csv(output_dir / "normalized.csv")
         self.write_error_json(output_dir / "_error.json")
         self.write_all_geojson(output_dir / "all.geojson")
@@ -252,28 +480,31 @@ if __name__ == "__main__":
 
     # GeoJSONのFeatureを作成するサンプル
     # addressからジオコーディングでlat,lngを取得
-    rawdata = pd.Series(
-        {
-            "address": "足利市上渋垂町字伊勢宮364-1 なんとかビル1F",
-            "genre_name": "ラーメン・餃子",
-            "official_page": "https://www.kourakuen.co.jp/",
-            "shop_name": "幸楽苑 足利店",
-            "tel": "0284-70-5620",
-            "zip_code": "326-0335",
-        }
-    )
+    # MEMO: normalize_and_geocode()はdictを受け取るので、pd.Seriesではなくdictのまま渡す
+    rawdata = {
+        "address": "足利市上渋垂町字伊勢宮364-1 なんとかビル1F",
+        "genre_name": "ラーメン・餃子",
+        "official_page": "https://www.kourakuen.co.jp/",
+        "detail_page": "",
+        "shop_name": "幸楽苑 足利店",
+        "tel": "0284-70-5620",
+        "zip_code": "326-0335",
+        "provided_lat": "",
+        "provided_lng": "",
+    }
+    rawdata["genre_code"] = genre.classify(rawdata["genre_name"])
     normalized_data = normalize_and_geocode(rawdata, pref_name="tochigi")
     feature = make_feature(normalized_data, debug=True)
 
-    assert feature.properties["shop_name"] == "幸楽苑 足利店"
-    assert feature.properties["genre_code"] == genre.GENRE_麺類
-    assert feature.properties["address"] == "足利市上渋垂町字伊勢宮364-1 なんとかビル1F"
-    assert feature.properties["normalized_address"] == "栃木県足利市上渋垂町字伊勢宮364-1"
-    assert feature.properties["_dams_score"] == 5
-    assert feature.properties["_dams_name"] == "栃木県足利市上渋垂町"
-    assert feature.properties["_dams_tail"] == "伊勢宮364-1"
-    assert feature.geometry.type == "Point"
-    assert feature.geometry.coordinates == [
+    assert feature["properties"]["shop_name"] == "幸楽苑 足利店"
+    assert feature["properties"]["genre_code"] == genre.GENRE_麺類
+    assert feature["properties"]["address"] == "足利市上渋垂町字伊勢宮364-1 なんとかビル1F"
+    assert feature["properties"]["normalized_address"] == "栃木県足利市上渋垂町字伊勢宮364-1"
+    assert feature["properties"]["_dams_score"] == 5
+    assert feature["properties"]["_dams_name"] == "栃木県足利市上渋垂町"
+    assert feature["properties"]["_dams_tail"] == "伊勢宮364-1"
+    assert feature["geometry"]["type"] == "Point"
+    assert feature["geometry"]["coordinates"] == [
         139.465439,
         36.301109,
     ], "latlng did not match."
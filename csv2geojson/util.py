@@ -1,7 +1,6 @@
 import re
 from functools import lru_cache
 
-import pandas as pd
 import posuto
 import w3lib.html
 from logzero import logger
@@ -10,7 +9,18 @@ from validator_collection import checkers
 
 from .exceptions import GeocodeError, NormalizeError, ValidationWarning
 
-DAMS.init_dams()
+# MEMO: DAMS.init_dams()は辞書の読み込みで重いので、import時ではなくジオコーディングが必要になった時に1回だけ呼ぶ
+_DAMS_READY = False
+
+
+def init_dams():
+    """
+    DAMSの初期化(何度呼ばれても初期化は1回だけ)
+    """
+    global _DAMS_READY
+    if not _DAMS_READY:
+        DAMS.init_dams()
+        _DAMS_READY = True
 
 
 @lru_cache(maxsize=None)
@@ -19,38 +29,54 @@ def cached_posuto_pref(zip_code: str):
     return posuto.get(zip_code).prefecture
 
 
-def validate(row: pd.Series):
+@lru_cache(maxsize=None)
+def cached_is_url(url: str):
+    """ checkers.is_urlは正規表現でのチェックなどで結構重く、チェーン店などで同じURLが何度も出てくるので、簡易キャッシュさせている """
+    return checkers.is_url(url)
+
+
+# 郵便番号、電話番号の書式のバリデーション用パターン
+# MEMO: 行ごとにvalidate()が呼ばれるので、モジュール読み込み時にコンパイルしておく
+_PATTERN_区切り文字 = re.compile(r"[ -‐－‑ー−‒–—―ｰ　]")  # (区切り文字適当)
+_PATTERN_電話番号 = re.compile(r"^0\d{9,10}$")  # 0始まりの半角数字9〜10桁
+_PATTERN_郵便番号 = re.compile(r"\d{7}$")  # 半角数字7桁
+
+# HTMLタグが含まれていないかチェックする項目
+_HTML_CHECK_FIELDS = (
+    "shop_name",
+    "address",
+    "official_page",
+    "detail_page",
+    "opening_hours",
+    "closing_day",
+    "area_name",
+)
+
+
+def validate(row: dict):
     """
     入力データに対する、お気持ち程度のバリデーションチェック
     """
     official_page = row["official_page"]
-    if official_page and checkers.is_url(official_page) == False:
+    if official_page and cached_is_url(official_page) == False:
         raise ValidationWarning("公式URL(officical_page)が不正です")
     detail_page = row["detail_page"]
-    if detail_page and checkers.is_url(detail_page) == False:
+    if detail_page and cached_is_url(detail_page) == False:
         raise ValidationWarning("詳細ページ(detail_page)のURLが不正です")
 
     # 郵便番号、電話番号の書式のバリデーション(厳密ではない)
-    remove_char_regex = r"[ -‐－‑ー−‒–—―ｰ　]"  # (区切り文字適当)
-    tel = re.sub(remove_char_regex, "", row["tel"])
-    if tel and not re.match(r"^0\d{9,10}$", tel):
+    tel = _PATTERN_区切り文字.sub("", row["tel"])
+    if tel and not _PATTERN_電話番号.match(tel):
         raise ValidationWarning("電話番号(tel)の書式が不正です")  # 0始まりの半角数字9〜10桁
-    zip_code = re.sub(remove_char_regex, "", row["zip_code"])
-    if zip_code and not re.match(r"\d{7}$", zip_code):
+    zip_code = _PATTERN_区切り文字.sub("", row["zip_code"])
+    if zip_code and not _PATTERN_郵便番号.match(zip_code):
         raise ValidationWarning("郵便番号(zip_code)の書式が不正です")  # 半角数字7桁
 
     # HTMLタグが含まれてほしくないやつに含まれている
-    for target in [
-        "shop_name",
-        "address",
-        "official_page",
-        "detail_page",
-        "opening_hours",
-        "closing_day",
-        "area_name",
-    ]:
+    for target in _HTML_CHECK_FIELDS:
         text = row.get(target)
-        if not text:
+        # MEMO: '<'を含まない文字列はタグを含みようがないので、remove_tags()を呼ばない(ほとんどの行はこちら)
+        if not text or "<" not in text:
             continue
         if len(text) != len(w3lib.html.remove_tags(text)):
             raise ValidationWarning(f"{target}にHTMLタグが含まれています")
@@ -64,12 +90,12 @@ def validate(row: pd.Series):
     except KeyError:
         # MEMO: posutoのデータには存在しない(特殊な)郵便番号が指定されている場合がある
         # いわゆる「大口事業所個別番号」というやつで、そういうのはどうしようもないのでバリデーション成功とする
-        logger.info(f"不明な郵便番号です (「大口事業所個別番号」かも？) : zip code={zip_code}")
+        logger.info("不明な郵便番号です (「大口事業所個別番号」かも？) : zip code=%s", zip_code)
         return
     except Exception as e:
         # MEMO: その他特殊すぎる郵便番号などでposuto内部でエラーが起きた場合
         logger.warning(e, stack_info=True)
-        logger.warning(f"unknown posuto error, zip code={zip_code}")
+        logger.warning("unknown posuto error, zip code=%s", zip_code)
         raise ValidationWarning(f"posutoでエラーになる郵便番号です(内部処理エラー)")
 
     norm_addr = row.get("normalized_address")
@@ -95,8 +121,11 @@ def validate(row: pd.Series):
 # 以下の正規表現に「無番地」を追加
 # @see https://qiita.com/shouta-dev/items/b87efc19e105045881de
 regex = r"([0-9０-９]+|[一二三四五六七八九十百千万]+)*(([0-9０-９]+|[一二三四五六七八九十百千万]+)|(丁目|丁|無番地|番地|番|号|-|‐|－|‑|ー|−|‒|–|—|―|ｰ|の|東|西|南|北){1,2})*(([0-9０-９]+|[一二三四五六七八九十百千万]}+)|(丁目|丁|無番地|番地|番|号){1,2})"
+# MEMO: 住所ごとに呼ばれるので、re.searchに文字列を渡さずにモジュール読み込み時にコンパイルしておく
+_PATTERN_番地 = re.compile(regex)
 
 
+@lru_cache(maxsize=None)
 def normalize_for_pydams(address: str, pref_name: str):
     """
     pydamsが正しくジオコーディング結果を返せる形式に住所文字列を正規化
@@ -104,16 +133,19 @@ def normalize_for_pydams(address: str, pref_name: str):
      ・区切りスペースはあってもなくてもOK(どちらでもpydamsの結果には影響しないっぽい)
      ・丁目、番地は漢数字・半角数字・全角数字どれでもOK
      ・xx-yy形式でも、xx番地yy丁目形式でもOK
+    MEMO: チェーン店やショッピングモールなどで同じ住所が何度も出てくるので、結果をキャッシュしている
     """
     if not address:
         return ""
 
     # 番地部分だけ抽出
-    m = re.search(regex, address)
+    m = _PATTERN_番地.search(address)
     if not m:
         raise NormalizeError(f"住所の正規化に失敗しました。 address={address}")
+    # MEMO: address.split(addr2)[0]で探し直さず、matchした位置で切り出す
+    # (searchは最も左のmatchを返すので、それより前にaddr2が現れることはなく、結果は同じ)
+    addr1 = address[: m.start()]
     addr2 = m.group()
-    addr1 = address.split(addr2)[0]
 
     # 住所が都道府県名から始まってない場合はpref_nameで補填
     pref_ja = pref_name_ja_from_roman(pref_name)
@@ -123,11 +155,14 @@ def normalize_for_pydams(address: str, pref_name: str):
     return addr1 + addr2
 
 
+@lru_cache(maxsize=None)
 def geocode_with_pydams(normalized_address: str):
     """
     PyDAMSを利用したジオコーディング
+    MEMO: DAMSの呼び出しが一番重いので、同じ住所に対する結果はキャッシュしている(戻り値はtupleなのでそのまま使い回せる)
     """
     # @see http://newspat.csis.u-tokyo.ac.jp/geocode/modules/dams/index.php?content_id=4
+    init_dams()
     geocoded = DAMS.geocode_simplify(normalized_address)
     if not geocoded:
         raise GeocodeError("ジオコーディングの結果がありせんでした。(内部エラー)")
@@ -145,66 +180,70 @@ def geocode_with_pydams(normalized_address: str):
     return (lat, lng, (score, name, tail))
 
 
+# なんかなかったっけと思って探したけど(pycountryとか)都道府県名まで入ってるのがなかったので脳死対応
+# jsかなんかのをコピペしているので許してくれ #FIXME
+_PREFS = {
+    "北海道": "hokkaido",
+    "青森県": "aomori",
+    "岩手県": "iwate",
+    "宮城県": "miyagi",
+    "秋田県": "akita",
+    "山形県": "yamagata",
+    "福島県": "fukushima",
+    "茨城県": "ibaraki",
+    "栃木県": "tochigi",
+    "群馬県": "gunma",
+    "埼玉県": "saitama",
+    "千葉県": "chiba",
+    "東京都": "tokyo",
+    "神奈川県": "kanagawa",
+    "新潟県": "niigata",
+    "富山県": "toyama",
+    "石川県": "ishikawa",
+    "福井県": "fukui",
+    "山梨県": "yamanashi",
+    "長野県": "nagano",
+    "岐阜県": "gifu",
+    "静岡県": "shizuoka",
+    "愛知県": "aichi",
+    "三重県": "mie",
+    "滋賀県": "shiga",
+    "京都府": "kyoto",
+    "大阪府": "osaka",
+    "兵庫県": "hyogo",
+    "奈良県": "nara",
+    "和歌山県": "wakayama",
+    "鳥取県": "tottori",
+    "島根県": "shimane",
+    "岡山県": "okayama",
+    "広島県": "hiroshima",
+    "山口県": "yamaguchi",
+    "徳島県": "tokushima",
+    "香川県": "kagawa",
+    "愛媛県": "ehime",
+    "高知県": "kochi",
+    "福岡県": "fukuoka",
+    "佐賀県": "saga",
+    "長崎県": "nagasaki",
+    "熊本県": "kumamoto",
+    "大分県": "oita",
+    "宮崎県": "miyazaki",
+    "鹿児島県": "kagoshima",
+    "沖縄県": "okinawa",
+}
+
+# ローマ字表記から都道府県名への逆引き用
+# MEMO: 住所の正規化のたびに呼ばれるので、呼び出しごとにdictを作って線形探索せず、モジュール読み込み時に作っておく
+_PREF_NAME_JA_FROM_ROMAN = {v: k for k, v in _PREFS.items()}
+# FIXME: 静岡(青券)のクソ対応
+_PREF_NAME_JA_FROM_ROMAN["shizuoka_blue"] = "静岡県"
+
+
 def pref_name_ja_from_roman(pref_name: str):
     """
     例: pref_name_ja_from_roman(pref_name='tochigi') -> '栃木県'
     """
-    # FIXME: 静岡(青券)のクソ対応
-    if pref_name == "shizuoka_blue":
-        return "静岡県"
-
-    # なんかなかったっけと思って探したけど(pycountryとか)都道府県名まで入ってるのがなかったので脳死対応
-    # jsかなんかのをコピペしているので許してくれ #FIXME
-    prefs = {
-        "北海道": "hokkaido",
-        "青森県": "aomori",
-        "岩手県": "iwate",
-        "宮城県": "miyagi",
-        "秋田県": "akita",
-        "山形県": "yamagata",
-        "福島県": "fukushima",
-        "茨城県": "ibaraki",
-        "栃木県": "tochigi",
-        "群馬県": "gunma",
-        "埼玉県": "saitama",
-        "千葉県": "chiba",
-        "東京都": "tokyo",
-        "神奈川県": "kanagawa",
-        "新潟県": "niigata",
-        "富山県": "toyama",
-        "石川県": "ishikawa",
-        "福井県": "fukui",
-        "山梨県": "yamanashi",
-        "長野県": "nagano",
-        "岐阜県": "gifu",
-        "静岡県": "shizuoka",
-        "愛知県": "aichi",
-        "三重県": "mie",
-        "滋賀県": "shiga",
-        "京都府": "kyoto",
-        "大阪府": "osaka",
-        "兵庫県": "hyogo",
-        "奈良県": "nara",
-        "和歌山県": "wakayama",
-        "鳥取県": "tottori",
-        "島根県": "shimane",
-        "岡山県": "okayama",
-        "広島県": "hiroshima",
-        "山口県": "yamaguchi",
-        "徳島県": "tokushima",
-        "香川県": "kagawa",
-        "愛媛県": "ehime",
-        "高知県": "kochi",
-        "福岡県": "fukuoka",
-        "佐賀県": "saga",
-        "長崎県": "nagasaki",
-        "熊本県": "kumamoto",
-        "大分県": "oita",
-        "宮崎県": "miyazaki",
-        "鹿児島県": "kagoshima",
-        "沖縄県": "okinawa",
-    }
-    return [k for k, v in prefs.items() if v == pref_name][0]
+    return _PREF_NAME_JA_FROM_ROMAN[pref_name]
 
 
 if __name__ == "__main__":
@@ -2,6 +2,7 @@ import argparse
 import logging
 import os
 import pathlib
+from concurrent.futures import ProcessPoolExecutor
 from distutils.util import strtobool
 
 import logzero
@@ -10,7 +11,20 @@ from logzero import logger
 from csv2geojson.parser import Csv2GeoJSON
 
 
-def main(input_dir, output_dir, pref_list: list):
+def convert(input_dir, output_dir, pref: str, processes=None, cache_dir=None):
+    """
+    都道府県ごとのCSVをGeoJSONに変換
+    """
+    try:
+        src = input_dir / f"{pref}.csv"
+        parser = Csv2GeoJSON(src, processes=processes, cache_dir=cache_dir)
+        parser.write_all(output_dir / pref)
+    except Exception as e:
+        logger.error(f"[{pref}] ERROR.")
+        logger.error(e, stack_info=True)
+
+
+def main(input_dir, output_dir, pref_list: list, cache_dir=None):
     # 雑にログ出力設定
     # MEMO: 開発時はdocker-compose.ymlからEnvでLOGGER_DEBUG=Trueを指定
     # 運用時は_error.jsonを見ろって感じなのでDebug出力なし
@@ -18,15 +32,18 @@ def main(input_dir, output_dir, pref_list: list):
     if strtobool(os.getenv("LOGGER_DEBUG", "False")):
         logzero.loglevel(logging.DEBUG)
 
-    # MEMO: 並列処理してあげると多少早く終わるかも
-    for pref in sorted(pref_list):
-        try:
-            src = input_dir / f"{pref}.csv"
-            parser = Csv2GeoJSON(src)
-            parser.write_all(output_dir / pref)
-        except Exception as e:
-            logger.error(f"[{pref}] ERROR.")
-            logger.error(e, stack_info=True)
+    # 都道府県が1つだけの場合は、Csv2GeoJSON側で行単位の並列処理
+    if len(pref_list) <= 1:
+        for pref in pref_list:
+            convert(input_dir, output_dir, pref, cache_dir=cache_dir)
+        return
+
+    # 都道府県ごとに独立しているので、都道府県単位でプロセス並列
+    # MEMO: 行単位の並列処理と二重にならないよう、こちらの場合はCsv2GeoJSON側では並列化しない(processes=1)
+    with ProcessPoolExecutor(max_workers=min(len(pref_list), os.cpu_count())) as executor:
+        futures = [executor.submit(convert, input_dir, output_dir, pref, 1, cache_dir) for pref in sorted(pref_list)]
+        for future in futures:
+            future.result()
 
 
 if __name__ == "__main__":
@@ -36,14 +53,18 @@ if __name__ == "__main__":
     # TODO: もう少し真面目にしてあげたい
     parser = argparse.ArgumentParser(description="goto-eat-csv2geojson")
     parser.add_argument("--target", help="例: tochigi")  # 個別指定オプション
+    parser.add_argument("--no-cache", action="store_true", help="ジオコーディング結果のキャッシュを使わない")
     args = parser.parse_args()
 
     input_dir = pathlib.Path(__file__).parent / "data" / "input" / "csvs"
     output_dir = pathlib.Path(__file__).parent / "data" / "output"
+    cache_dir = pathlib.Path(__file__).parent / "data" / "cache" / "geocode"  # ジオコーディング結果のキャッシュ
+    if args.no_cache:
+        cache_dir = None
 
     # --target 指定がなければ data/input/csvs/ 以下の *.csv 全てを対象
     pref_list = args.target.split(",") if args.target else [x.stem for x in input_dir.glob("*.csv")]
 
     print(f"pref_list = {pref_list}")
-    main(input_dir, output_dir, pref_list)
+    main(input_dir, output_dir, pref_list, cache_dir)
     print(f"done.")